@@ -16,6 +16,7 @@ setuptools.setup(
     install_requires=[
         'requests>=2.13.0',
         'beautifulsoup4>=4.6.0',
+        'numpy>=1.13.0',
     ],
     classifiers=(
         "Programming Language :: Python :: 3",
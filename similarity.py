@@ -0,0 +1,290 @@
+"""
+Find headwords whose synonyms look like the synonyms of some other headword.
+
+Comparing every pair of Word.synonyms('all') gets slow quickly, so instead
+we boil each word's synonyms down to a MinHash signature (numPerm small ints
+whose agreement estimates the Jaccard similarity of two synonym sets), and
+file the signatures into locality-sensitive hash buckets, band by band. A
+query only has to look at the words that share a bucket with it.
+
+>>> from thesaurus import fetch_list_of_words, POS_NOUN
+>>> from similarity import SimilarityIndex
+>>> index = SimilarityIndex(weighted=True, partOfSpeech=POS_NOUN)
+>>> index.update(asyncio.run(fetch_list_of_words(l)))
+>>> index.similar('apple', k=5)  # [(headword, similarity), ...]
+>>> index.save('index.pickle')
+"""
+import pickle
+import zlib
+
+import numpy as np
+
+# the hash family is h(x) = ((a*x + b) mod MERSENNE_PRIME) & MAX_HASH. Keeping
+#   a under 2**31 and x under 2**32 means a*x + b never overflows uint64.
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _hash_elements(elements):
+    """Stable 32 bit hashes for a collection of str. hash() changes from one
+    process to the next, which would ruin our saved signatures.
+    """
+    return np.array([zlib.crc32(e.encode('utf8')) & 0xffffffff
+                     for e in elements], dtype=np.uint64)
+
+
+class SimilarityIndex(object):
+    def __init__(self, numPerm=128, bands=64, weighted=False, seed=1,
+                 **filters):
+        """An approximate nearest neighbor index over the synonym sets of
+        fetched Word objects.
+
+        Parameters
+        ----------
+        numPerm : int, optional
+            Length of each MinHash signature. More is more accurate, but slower
+            and bigger. 128 is the default.
+        bands : int, optional
+            Number of LSH bands the signature is cut into. numPerm must divide
+            evenly by it. More bands find more candidates for a query (better
+            recall, slower queries). With r = numPerm/bands rows per band, two
+            words with similarity s share a bucket with probability
+            1 - (1 - s**r)**bands, which passes 1/2 around s = (1/bands)**(1/r).
+            64 is the default (2 rows), so about s >= 0.125: synonym sets of
+            different headwords rarely overlap much more than that.
+        weighted : bool, optional
+            If True, a synonym counts `Entry.relevance` times (1-3), so two
+            words sharing their most relevant synonyms look more alike than two
+            words sharing their least relevant ones.
+        seed : int, optional
+            Seed for the hash functions. Signatures made with different seeds
+            (or numPerm) can't be compared.
+        **filters
+            _filter() filters picking the synonyms we hash, Ex: partOfSpeech=
+            POS_NOUN. See its docstring.
+        """
+        if numPerm % bands:
+            raise ValueError('numPerm (%d) must be a multiple of bands (%d).'
+                             % (numPerm, bands))
+
+        self.numPerm = numPerm
+        self.bands = bands
+        self.rows = numPerm // bands
+        self.weighted = weighted
+        self.seed = seed
+        self.filters = filters
+
+        state = np.random.RandomState(seed)
+        self._a = state.randint(1, 1 << 31, size=numPerm).astype(np.uint64)
+        self._b = state.randint(0, 1 << 31, size=numPerm).astype(np.uint64)
+
+        self.signatures = {}  # headword -> signature
+
+        # Every word lands in every band, so the buckets are most of our
+        #   memory. To keep them small, headwords go in as int ids, band keys
+        #   are hash()es of the band (fine, since load() rebuilds them), and a
+        #   bucket is a bare id until a second word joins it, then a list.
+        self._ids = {}        # headword -> id
+        self._headwords = {}  # id -> headword
+        self._next_id = 0
+        self._buckets = [{} for _ in range(bands)]  # band key -> id or [id]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, headword):
+        return headword in self.signatures
+
+    ### FUNCTIONS TO BUILD SIGNATURES ###
+    def synonym_set(self, word):
+        """The set of str we hash for a Word: all its synonyms, across every
+        definition, that pass our filters. If weighted, a synonym with
+        relevance 3 shows up as 'x', 'x\\x001' and 'x\\x002'.
+        """
+        if not getattr(word, 'data', None):
+            return set()
+
+        if not self.weighted:
+            return set(s for defn in word.synonyms('all', **self.filters)
+                       for s in defn)
+
+        wanted = self.filters.get('relevance', [1, 2, 3])
+        if not isinstance(wanted, list):
+            wanted = [wanted]
+
+        elements = set()
+        for relevance in (1, 2, 3):
+            if relevance not in wanted:
+                continue
+            filters = dict(self.filters, relevance=relevance)
+            for defn in word.synonyms('all', **filters):
+                for s in defn:
+                    elements.add(s)
+                    elements.update('%s\x00%d' % (s, i)
+                                    for i in range(1, relevance))
+        return elements
+
+    def signature(self, word):
+        """MinHash signature of a Word's synonym set, as a uint32 array of
+        length numPerm, or None if it has no synonyms that pass our filters.
+        """
+        elements = self.synonym_set(word)
+        if not elements:
+            return None
+
+        hashes = _hash_elements(elements)
+        perms = (np.outer(self._a, hashes) + self._b[:, None]) \
+            % MERSENNE_PRIME & MAX_HASH
+        return perms.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [hash(signature[i*self.rows:(i+1)*self.rows].tobytes())
+                for i in range(self.bands)]
+
+    ### FUNCTIONS TO ADD AND REMOVE WORDS ###
+    def add(self, word, signature=None):
+        """Index a fetched Word, replacing whatever we had for its headword.
+
+        Returns
+        -------
+        bool
+            False if the word had no synonyms to index (not fetched, not
+            found, or filtered out), in which case it isn't added, and any
+            older version of it is removed.
+        """
+        headword = word if isinstance(word, str) else word.word
+        self.remove(headword)
+
+        if signature is None:
+            signature = self.signature(word)
+        if signature is None:
+            return False
+
+        id_ = self._next_id
+        self._next_id += 1
+        self._ids[headword] = id_
+        self._headwords[id_] = headword
+        self.signatures[headword] = signature
+
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is None:
+                bucket[key] = id_
+            elif isinstance(members, list):
+                members.append(id_)
+            else:
+                bucket[key] = [members, id_]
+        return True
+
+    def update(self, words):
+        """Index many Words at once, Ex: the dict fetch_list_of_words() returns,
+        or any iterable of Words. Call it again as new words come in.
+
+        Returns
+        -------
+        int
+            How many of them were indexed.
+        """
+        if isinstance(words, dict):
+            words = words.values()
+        return sum(self.add(w) for w in words)
+
+    def remove(self, headword):
+        """Drop a headword from the index, if it's there."""
+        signature = self.signatures.pop(headword, None)
+        if signature is None:
+            return
+        id_ = self._ids.pop(headword)
+        del self._headwords[id_]
+
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket[key]
+            if not isinstance(members, list):
+                del bucket[key]
+                continue
+            members.remove(id_)
+            if len(members) == 1:
+                bucket[key] = members[0]
+
+    ### FUNCTIONS TO QUERY THE INDEX ###
+    def similar(self, word, k=10):
+        """The (approximately) k headwords whose synonym sets are most similar
+        to those of `word`.
+
+        Parameters
+        ----------
+        word : str or Word
+            A headword already in the index, or a fetched Word (which doesn't
+            have to be in the index).
+        k : int, optional
+            How many results we want. 10 is the default. Only words sharing
+            an LSH bucket are considered, so we may return fewer.
+
+        Returns
+        -------
+        list of (str, float)
+            (headword, estimated Jaccard similarity), most similar first. The
+            word itself is left out.
+        """
+        if isinstance(word, str):
+            headword, signature = word, self.signatures[word]
+        else:
+            headword, signature = word.word, self.signature(word)
+            if signature is None:
+                return []
+
+        ids = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if isinstance(members, list):
+                ids.update(members)
+            elif members is not None:
+                ids.add(members)
+        ids.discard(self._ids.get(headword))
+        if not ids:
+            return []
+
+        candidates = sorted(self._headwords[i] for i in ids)
+        others = np.stack([self.signatures[c] for c in candidates])
+        scores = (others == signature).mean(axis=1)
+
+        # sort by score, most similar first, and alphabetically for ties.
+        best = np.argsort(-scores, kind='stable')[:k]
+        return [(candidates[i], float(scores[i])) for i in best]
+
+    def jaccard(self, word1, word2):
+        """Estimated Jaccard similarity of two indexed headwords' synonyms."""
+        return float((self.signatures[word1] == self.signatures[word2]).mean())
+
+    ### FUNCTIONS TO SAVE AND LOAD THE INDEX ###
+    def save(self, path):
+        """Write the signatures (and what's needed to keep adding to them) to
+        `path`. The buckets get rebuilt on load().
+        """
+        headwords = sorted(self.signatures)
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'numPerm': self.numPerm,
+                'bands': self.bands,
+                'weighted': self.weighted,
+                'seed': self.seed,
+                'filters': self.filters,
+                'headwords': headwords,
+                'signatures': np.stack([self.signatures[h] for h in headwords])
+                              if headwords else None,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save()."""
+        with open(path, 'rb') as f:
+            saved = pickle.load(f)
+
+        index = cls(numPerm=saved['numPerm'], bands=saved['bands'],
+                    weighted=saved['weighted'], seed=saved['seed'],
+                    **saved['filters'])
+        for headword, signature in zip(saved['headwords'],
+                                       saved['signatures']
+                                       if saved['headwords'] else []):
+            index.add(headword, signature=signature)
+        return index
@@ -0,0 +1,348 @@
+"""
+Benchmarks for the thesaurus api, run over recorded pages so the numbers
+don't depend on thesaurus.com being fast (or up) today.
+
+    $ python -m test.benchmark                  # run, compare to baseline
+    $ python -m test.benchmark --save-baseline  # run, store as new baseline
+    $ python -m test.benchmark --record         # rebuild the recorded pages
+
+It measures:
+    parse_html          seconds to parse every recorded page once, and (for
+                        information only) seconds per call for each page
+    filter              _filter()/synonyms() queries per second
+    end_to_end          words per second through fetch_list_of_words(),
+                        against a local stub server serving the recorded pages
+    memory              peak bytes allocated to parse and hold 10k words
+
+Results are written as JSON, and compared against the baseline in
+test/benchmark_baseline.json. If any of them regressed by more than --threshold
+(35% by default), we exit with 1. Baselines are only meaningful on the machine
+that made them, so they aren't checked in: save one with --save-baseline
+before making changes. Without a baseline, we exit with 2.
+"""
+import argparse
+import asyncio
+import html
+import json
+import logging
+import os
+import sys
+import timeit
+import tracemalloc
+
+import dill
+from aiohttp import web
+
+import thesaurus
+from thesaurus import Word, fetch_list_of_words
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PICKLE_PATH = os.path.join(HERE, 'l_words.pickle')
+PAGES_DIR = os.path.join(HERE, 'pages')
+BASELINE_PATH = os.path.join(HERE, 'benchmark_baseline.json')
+
+# the metrics we fail on, and whether a bigger number is better for each.
+#   the per page parse_html timings are too small and noisy to check alone.
+HIGHER_IS_BETTER = {
+    'parse_html_total_seconds': False,
+    'filter_queries_per_sec': True,
+    'end_to_end_words_per_sec': True,
+    'peak_memory_bytes_per_10k_words': False,
+}
+
+# the queries we time _filter() with. a mix of what people actually ask for.
+QUERIES = [
+    dict(defnNum=0),
+    dict(defnNum='all'),
+    dict(defnNum='all', allowEmpty=False, partOfSpeech=thesaurus.POS_NOUN),
+    dict(defnNum='all', relevance=[2, 3], form=thesaurus.FORM_COMMON),
+    dict(defnNum=0, length=1, isVulgar=False),
+]
+
+
+# =============================   RECORDED PAGES   =============================
+def load_words():
+    with open(PICKLE_PATH, 'rb') as f:
+        return dill.load(f)
+
+def render_page(w):
+    """Turn a fetched Word back into the page thesaurus.com served for it, so
+    that parse_html() gets us the same data again.
+    """
+    def render_entries(entries):
+        return [{
+            'term': e.word,
+            'similarity': str([None, 10, 50, 100][e.relevance]),
+            'isInformal': '1' if e.form == 'informal' else '0',
+        } for e in entries]
+
+    state = {'searchData': {'tunaApiData': {
+        'posTabs': [{
+            'pos': defn['partOfSpeech'],
+            'definition': defn['meaning'],
+            'isVulgar': '1' if defn['isVulgar'] else '0',
+            'synonyms': render_entries(defn['syn']),
+            'antonyms': render_entries(defn['ant']),
+        } for defn in w.data],
+        'exampleSentences': [{'sentence': s} for s in w.extra['examples']],
+        'etymology': [{'content': '<p>%s</p>' % html.escape(w.extra['origin'])}]
+                     if w.extra['origin'] else [],
+    }}}
+
+    # keep the json from closing our <script> tag early.
+    state = json.dumps(state).replace('</', '<\\/')
+    return (
+        '<!DOCTYPE html><html><head><title>%s</title></head><body>'
+        '<script>window.__ads = [];</script>'
+        '<script>window.INITIAL_STATE = %s;</script>'
+        '</body></html>' % (html.escape(w.word), state)
+    )
+
+def record_pages():
+    if not os.path.isdir(PAGES_DIR):
+        os.makedirs(PAGES_DIR)
+    for word, w in sorted(load_words().items()):
+        with open(os.path.join(PAGES_DIR, word + '.html'), 'w') as f:
+            f.write(render_page(w))
+        print('recorded', word)
+
+def load_pages():
+    pages = {}
+    for name in sorted(os.listdir(PAGES_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(PAGES_DIR, name)) as f:
+                pages[name[:-len('.html')]] = f.read()
+    return pages
+
+
+# ===============================   BENCHMARKS   ===============================
+def parse_html_round(timers):
+    """Time each page's parse_html() once. `timers` is {word: (Timer,
+    number)}, as made by bench_parse_html().
+
+    Returns
+    -------
+    (float, dict)
+        Seconds to parse every page once, and seconds per call for each page.
+    """
+    per_page = {}
+    for word, (timer, number) in timers.items():
+        per_page[word] = timer.timeit(number) / number
+    return sum(per_page.values()), per_page
+
+def bench_parse_html(pages):
+    """Returns a function timing one round of parse_html() over every page."""
+    timers = {}
+    for word, page in pages.items():
+        w = Word(word)
+        timer = timeit.Timer(lambda w=w, page=page: w.parse_html(page, w.url))
+        number, _ = timer.autorange()
+        timers[word] = (timer, number)
+    return lambda: parse_html_round(timers)
+
+def bench_filter(words):
+    """Returns a function timing one round of synonyms() queries over all our
+    words, in queries per second.
+    """
+    words = list(words.values())
+
+    def run():
+        for w in words:
+            for q in QUERIES:
+                w.synonyms(**dict(q))
+
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    return lambda: number * len(words) * len(QUERIES) / timer.timeit(number)
+
+async def serve_pages(pages):
+    """Start a stub thesaurus.com on a free local port. Returns its runner
+    (clean it up when you're done) and its /browse/ url.
+    """
+    async def browse(request):
+        # 'good~3' is just another name for 'good'. See _fetch_from_stub().
+        page = pages.get(request.match_info['word'].split('~')[0])
+        if page is None:
+            return web.Response(text='404 Not Found', status=404)
+        return web.Response(text=page, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/browse/{word}', browse)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, 'http://127.0.0.1:%d/browse/' % port
+
+async def _fetch_from_stub(pages, n):
+    runner, url = await serve_pages(pages)
+    old_url, thesaurus.URL_BROWSE = thesaurus.URL_BROWSE, url
+    try:
+        # fetch_list_of_words() only keeps one Word per name, so we give each
+        #   fetch its own name for a page, and can check every one of them.
+        names = list(pages)
+        words = ['%s~%d' % (names[i % len(names)], i) for i in range(n)]
+        start = timeit.default_timer()
+        words_dict = await fetch_list_of_words(words)
+        elapsed = timeit.default_timer() - start
+    finally:
+        thesaurus.URL_BROWSE = old_url
+        await runner.cleanup()
+
+    missing = [w for w in words if not getattr(words_dict.get(w), 'data', None)]
+    if missing:
+        raise RuntimeError('stub server fetch failed for %d of %d words: %s'
+                           % (len(missing), n, missing[:10]))
+    return elapsed
+
+def bench_end_to_end(pages, n):
+    """Returns a function timing one round of fetch_list_of_words() over `n`
+    words from the stub server, in words per second.
+    """
+    return lambda: n / asyncio.run(_fetch_from_stub(pages, n))
+
+def run_rounds(repeat, pages, words, n):
+    """Best of `repeat` rounds for each timed benchmark. The rounds take turns,
+    so a slow spell on the machine costs each benchmark one round at most,
+    instead of all the rounds of whichever one was running.
+    """
+    parse_html = bench_parse_html(pages)
+    filter_ = bench_filter(words)
+    end_to_end = bench_end_to_end(pages, n)
+
+    best = {
+        'parse_html_total_seconds': float('inf'),
+        'parse_html': dict((word, float('inf')) for word in pages),
+        'filter_queries_per_sec': 0,
+        'end_to_end_words_per_sec': 0,
+    }
+    for _ in range(repeat):
+        total, per_page = parse_html()
+        best['parse_html_total_seconds'] = min(
+            best['parse_html_total_seconds'], total)
+        for word, secs in per_page.items():
+            best['parse_html'][word] = min(best['parse_html'][word], secs)
+        best['filter_queries_per_sec'] = max(
+            best['filter_queries_per_sec'], filter_())
+        best['end_to_end_words_per_sec'] = max(
+            best['end_to_end_words_per_sec'], end_to_end())
+    return best
+
+def bench_memory(pages, n):
+    """Peak bytes allocated while parsing and holding on to `n` words, scaled
+    to 10k words.
+    """
+    names = list(pages)
+    tracemalloc.start()
+    try:
+        held = []
+        for i in range(n):
+            w = Word(names[i % len(names)])
+            w.data = w.parse_html(pages[w.word], w.url)
+            w.extra = w.data.pop()
+            held.append(w)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return int(peak * 10000 / n)
+
+
+# ================================   BASELINES   ===============================
+def flatten(results):
+    """{'parse_html': {'good': 1}} -> {'parse_html/good': 1}"""
+    flat = {}
+    for key, val in results.items():
+        if isinstance(val, dict):
+            for k, v in val.items():
+                flat[key + '/' + k] = v
+        else:
+            flat[key] = val
+    return flat
+
+def compare(results, baseline, threshold):
+    """Returns a list of (metric, baseline, result, change) for each metric in
+    HIGHER_IS_BETTER that regressed past the threshold. change is the
+    fractional slowdown.
+    """
+    regressions = []
+    for metric, higher_is_better in sorted(HIGHER_IS_BETTER.items()):
+        base, result = baseline.get(metric), results.get(metric)
+        if not base or result is None:
+            continue
+        if higher_is_better:
+            change = (base - result) / base
+        else:
+            change = (result - base) / base
+        if change > threshold:
+            regressions.append((metric, base, result, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the thesaurus api over recorded pages.')
+    parser.add_argument('--record', action='store_true',
+                        help='rebuild test/pages from l_words.pickle and exit')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='where to write the results as JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.35,
+                        help='fractional regression allowed before failing')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='timing rounds; the best one is kept')
+    parser.add_argument('--words', type=int, default=1000,
+                        help='words to fetch from the stub server')
+    parser.add_argument('--memory-words', type=int, default=10000,
+                        help='words to parse and hold for the memory check')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_pages()
+        return 0
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print('ERROR: No baseline at %s, so there is nothing to compare against.'
+              ' Run with --save-baseline first.' % args.baseline,
+              file=sys.stderr)
+        return 2
+
+    # thesaurus.py logs everything at DEBUG. the line per response costs more
+    #   than the stub server does.
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pages = load_pages()
+    results = run_rounds(args.repeat, pages, load_words(), args.words)
+    results['peak_memory_bytes_per_10k_words'] = bench_memory(
+        pages, args.memory_words)
+
+    for metric, val in sorted(flatten(results).items()):
+        print('%-45s %.6g' % (metric, val))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Saved baseline to', args.baseline)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    for metric, base, result, change in regressions:
+        print('REGRESSION %s: %.6g -> %.6g (%.0f%% worse)'
+              % (metric, base, result, change * 100))
+    if regressions:
+        return 1
+    print('No regressions past %.0f%%.' % (args.threshold * 100))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
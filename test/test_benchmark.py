@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from test.benchmark import (_fetch_from_stub, compare, load_pages, load_words,
+                            main)
+
+
+def test_recorded_pages_match_pickle():
+    # if this fails, rerun `python -m test.benchmark --record`
+    words, pages = load_words(), load_pages()
+    assert sorted(words) == sorted(pages)
+    for word, w in words.items():
+        data = w.parse_html(pages[word], w.url)
+        assert data.pop() == w.extra
+        assert data == w.data
+
+
+def test_compare_flags_regressions_only():
+    baseline = {
+        'parse_html_total_seconds': 2.0,
+        'parse_html': {'good': 1.0, 'bad': 1.0},
+        'filter_queries_per_sec': 100.0,
+        'end_to_end_words_per_sec': 100.0,
+        'peak_memory_bytes_per_10k_words': 1000,
+    }
+    results = {
+        'parse_html_total_seconds': 2.4,
+        # per page timings are for information only
+        'parse_html': {'good': 0.9, 'bad': 1.5},
+        'filter_queries_per_sec': 150.0,
+        'end_to_end_words_per_sec': 70.0,
+        'peak_memory_bytes_per_10k_words': 500,
+    }
+    assert [r[0] for r in compare(results, baseline, 0.25)] == \
+        ['end_to_end_words_per_sec']
+
+    results['parse_html_total_seconds'] = 2.6
+    assert [r[0] for r in compare(results, baseline, 0.25)] == \
+        ['end_to_end_words_per_sec', 'parse_html_total_seconds']
+
+
+def test_missing_baseline_fails(tmp_path):
+    assert main(['--baseline', str(tmp_path / 'nope.json'),
+                 '--output', str(tmp_path / 'results.json')]) == 2
+
+
+def test_stub_fetch_checks_every_word():
+    pages = load_pages()
+    assert asyncio.run(_fetch_from_stub(pages, 40)) > 0
+
+    # 40 fetches over 16 pages ask for 'good' 3 times, and each one counts.
+    pages['good'] = '404 Not Found'
+    with pytest.raises(RuntimeError, match='failed for 3 of 40'):
+        asyncio.run(_fetch_from_stub(pages, 40))
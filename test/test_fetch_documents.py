@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import dill
+import pytest
+
+import thesaurus
+from thesaurus import fetch_documents, tokenize
+
+with open(os.path.join(os.path.dirname(__file__), 'l_words.pickle'), 'rb') as f:
+    thesauri = dill.load(f)
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    # serve the recorded words instead of going to thesaurus.com
+    calls = []
+
+    async def fake_fetch_list_of_words(words):
+        calls.append(list(words))
+        return {w: thesauri.get(w, thesaurus.Word(w)) for w in words}
+
+    monkeypatch.setattr(thesaurus, 'fetch_list_of_words',
+                        fake_fetch_list_of_words)
+    return calls
+
+
+def test_tokenize():
+    text = "The good, the bad-tempered and the don't."
+    assert [t[0] for t in tokenize(text)] == \
+        ['The', 'good', 'the', 'bad-tempered', 'and', 'the', "don't"]
+    for word, start, end in tokenize(text):
+        assert text[start:end] == word
+
+    text = 'The café’s naïve owner didn’t say “résumé”.'
+    assert [t[0] for t in tokenize(text)] == \
+        ['The', 'café’s', 'naïve', 'owner', 'didn’t', 'say', 'résumé']
+    for word, start, end in tokenize(text):
+        assert text[start:end] == word
+
+
+def test_fetch_documents_dedupes_across_batch(fetched):
+    docs = ['A good man drinks from a good cup.',
+            'The man is not a good man, he is an evil man.']
+    results = asyncio.run(fetch_documents(docs))
+
+    assert len(fetched) == 1
+    assert sorted(fetched[0]) == ['cup', 'drinks', 'evil', 'good', 'man']
+
+    assert len(results) == 2
+    good = results[0][1]
+    assert good.word == 'good' and docs[0][good.start:good.end] == 'good'
+    assert good.synonyms == thesauri['good'].synonyms()
+    # stopwords and words we couldn't fetch map back to empty lists.
+    assert results[0][0].synonyms == []
+    assert results[0][3].synonyms == []
+
+
+def test_fetch_documents_normalizes_apostrophes(fetched):
+    docs = ["The man’s cup isn’t a man's mug.", "Don’t drop the MAN'S cup."]
+    results = asyncio.run(fetch_documents(docs))
+
+    # man’s and man's are fetched once, and the contractions not at all.
+    assert len(fetched) == 1
+    assert sorted(fetched[0]) == ['cup', 'drop', "man's", 'mug']
+    assert results[0][1].word == 'man’s'
+    assert results[0][3].word == 'isn’t' and results[0][3].synonyms == []
+
+
+def test_fetch_documents_filters_per_position(fetched):
+    doc = 'Good evil is good.'
+
+    def tokenFilters(docNum, tokenNum, word):
+        if tokenNum == 3:
+            return {'partOfSpeech': thesaurus.POS_NOUN}
+
+    results = asyncio.run(fetch_documents(
+        doc, defnNum='all', allowEmpty=False, tokenFilters=tokenFilters
+    ))
+    assert [t.word for t in results] == ['Good', 'evil', 'is', 'good']
+    assert results[0].synonyms == thesauri['good'].synonyms('all', False)
+    assert results[3].synonyms == \
+        thesauri['good'].synonyms('all', False, partOfSpeech=thesaurus.POS_NOUN)
@@ -0,0 +1,126 @@
+import copy
+import os
+import tracemalloc
+
+import dill
+import numpy as np
+import pytest
+
+from similarity import SimilarityIndex
+from thesaurus import Word
+
+with open(os.path.join(os.path.dirname(__file__), 'l_words.pickle'), 'rb') as f:
+    thesauri = dill.load(f)
+
+
+def twin(headword, of):
+    # a Word with somebody else's synonyms
+    w = copy.deepcopy(thesauri[of])
+    w.word = headword
+    return w
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_similar_finds_identical_synonym_sets(weighted):
+    index = SimilarityIndex(weighted=weighted)
+    assert index.update(thesauri) == len(thesauri)
+    index.add(twin('goodly', 'good'))
+
+    assert index.similar('good', k=1) == [('goodly', 1.0)]
+    assert index.similar(thesauri['good'])[0] == ('goodly', 1.0)
+    assert ('good', 1.0) in index.similar('goodly')
+
+
+def test_similar_finds_related_words():
+    # apple and green only share their shades of green (lime, olive...), about
+    #   as related as two different headwords get.
+    index = SimilarityIndex()
+    index.update(thesauri)
+
+    apple = index.synonym_set(thesauri['apple'])
+    green = index.synonym_set(thesauri['green'])
+    exact = len(apple & green) / float(len(apple | green))
+
+    [(headword, estimate)] = index.similar('apple', k=1)
+    assert headword == 'green'
+    assert abs(estimate - exact) < 0.1
+    assert index.similar('bad', k=1)[0][0] == 'evil'
+
+
+def test_filters_and_unfetched_words():
+    index = SimilarityIndex(partOfSpeech='no such pos')
+    assert index.update(thesauri) == 0
+    assert not index.add(Word('never fetched'))
+    assert len(index) == 0
+
+    with pytest.raises(ValueError):
+        SimilarityIndex(numPerm=100, bands=32)
+
+
+def test_remove_and_replace():
+    index = SimilarityIndex()
+    index.update(thesauri)
+    index.add(twin('goodly', 'good'))
+
+    index.remove('goodly')
+    assert 'goodly' not in index
+    assert 'goodly' not in [h for h, _ in index.similar('good')]
+
+    # re-adding a headword replaces its old signature
+    index.add(twin('goodly', 'good'))
+    index.add(twin('goodly', 'evil'))
+    assert index.similar('evil', k=1) == [('goodly', 1.0)]
+    assert 'goodly' not in [h for h, _ in index.similar('good')]
+
+
+def test_add_without_synonyms_removes_old_version():
+    index = SimilarityIndex()
+    index.add(thesauri['good'])
+
+    refetched = twin('good', 'good')
+    refetched.data = []
+    assert not index.add(refetched)
+    assert 'good' not in index
+    assert index.update(thesauri) == len(thesauri)
+
+
+def test_bytes_per_word():
+    # at hundreds of thousands of words, the buckets are what add up.
+    n = 5000
+    signatures = np.random.RandomState(0).randint(
+        0, 1 << 32, size=(n, 128), dtype=np.uint64).astype(np.uint32)
+
+    index = SimilarityIndex()
+    tracemalloc.start()
+    try:
+        for i in range(n):
+            index.add('w%d' % i, signature=signatures[i].copy())
+        used, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert used / n < 6000
+
+    for i in range(0, n, 2):
+        index.remove('w%d' % i)
+    assert len(index) == n // 2
+    assert index.similar('w1', k=1) == []
+
+    for i in range(1, n, 2):
+        index.remove('w%d' % i)
+    assert not any(index._buckets)
+
+
+def test_save_and_load(tmp_path):
+    index = SimilarityIndex(weighted=True, bands=64)
+    index.update(thesauri)
+    path = str(tmp_path / 'index.pickle')
+    index.save(path)
+
+    loaded = SimilarityIndex.load(path)
+    assert sorted(loaded.signatures) == sorted(index.signatures)
+    for headword in index.signatures:
+        assert loaded.similar(headword) == index.similar(headword)
+
+    # and we can keep adding to it
+    loaded.add(twin('goodly', 'good'))
+    assert loaded.similar('good', k=1) == [('goodly', 1.0)]
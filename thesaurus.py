@@ -14,6 +14,7 @@ import asyncio
 import sys
 from collections import namedtuple
 import json
+import re
 
 # import requests
 import aiohttp
@@ -24,10 +25,18 @@ from bs4 import BeautifulSoup
 Entry = namedtuple('Entry', ['word', 'relevance', 'length',
                              'complexity', 'form'])
 
+# how we will represent a token of a document passed to fetch_documents().
+#   `start` and `end` are character offsets, so text[start:end] == token.
+Token = namedtuple('Token', ['word', 'start', 'end', 'synonyms'])
+
 
 # ===========================   GLOBAL CONSTANTS   =============================
 ALL = 'all'
 
+# where Word.formatWordUrl() points. Change it to fetch from somewhere else,
+#   like the local stub server in test/benchmark.py.
+URL_BROWSE = 'https://www.thesaurus.com/browse/'
+
 ## form=
 FORM_INFORMAL = 'informal'
 FORM_COMMON =   'common'
@@ -48,6 +57,34 @@ POS_VERB =                      'verb'
 POS_ABBREVIATION, POS_ABB =     'abb', 'abb'
 POS_PHRASE =                    'phrase'
 POS_ARTICLE =                   'article'
+
+## stopwords= (words fetch_documents() won't bother looking up)
+STOPWORDS = frozenset([
+    'a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an',
+    'and', 'any', 'are', 'as', 'at', 'be', 'because', 'been', 'before',
+    'being', 'below', 'between', 'both', 'but', 'by', 'can', 'did', 'do',
+    'does', 'doing', 'down', 'during', 'each', 'few', 'for', 'from',
+    'further', 'had', 'has', 'have', 'having', 'he', 'her', 'here', 'hers',
+    'herself', 'him', 'himself', 'his', 'how', 'i', 'if', 'in', 'into', 'is',
+    'it', 'its', 'itself', 'just', 'me', 'more', 'most', 'my', 'myself', 'no',
+    'nor', 'not', 'now', 'of', 'off', 'on', 'once', 'only', 'or', 'other',
+    'our', 'ours', 'ourselves', 'out', 'over', 'own', 'same', 'she', 'should',
+    'so', 'some', 'such', 'than', 'that', 'the', 'their', 'theirs', 'them',
+    'themselves', 'then', 'there', 'these', 'they', 'this', 'those',
+    'through', 'to', 'too', 'under', 'until', 'up', 'very', 'was', 'we',
+    'were', 'what', 'when', 'where', 'which', 'while', 'who', 'whom', 'why',
+    'will', 'with', 'you', 'your', 'yours', 'yourself', 'yourselves',
+    # contractions, with straight apostrophes. fetch_documents() turns curly
+    #   ones into these before looking them up.
+    "aren't", "can't", "couldn't", "didn't", "doesn't", "don't", "hadn't",
+    "hasn't", "haven't", "he'd", "he'll", "he's", "here's", "how's", "i'd",
+    "i'll", "i'm", "i've", "isn't", "it'd", "it'll", "it's", "let's",
+    "mightn't", "mustn't", "needn't", "shan't", "she'd", "she'll", "she's",
+    "shouldn't", "that's", "there's", "they'd", "they'll", "they're",
+    "they've", "wasn't", "we'd", "we'll", "we're", "we've", "weren't",
+    "what's", "when's", "where's", "who's", "why's", "won't", "wouldn't",
+    "you'd", "you'll", "you're", "you've"
+])
 # =========================   END GLOBAL CONSTANTS   ===========================
 
 import logging
@@ -82,6 +119,100 @@ async def fetch_list_of_words(words):
         await asyncio.gather(*tasks)
     return words_dict
 
+def tokenize(text):
+    """Split a string into its words, remembering where each one came from.
+
+    Returns
+    -------
+    list of (str, int, int)
+        (word, start, end) for each word, where text[start:end] == word.
+        Letters can be any unicode letters ("café"), and apostrophes (straight
+        or curly) and hyphens inside a word are kept: "don't", "well-known".
+    """
+    return [(m.group(), m.start(), m.end())
+            for m in re.finditer(r"[^\W\d_]+(?:['’-][^\W\d_]+)*", text)]
+
+def _token_key(word):
+    """What fetch_documents() looks a token up as: lowercase, with curly
+    apostrophes made straight, so "Didn’t" and "didn't" are the same word.
+    """
+    return word.lower().replace('’', "'")
+
+async def fetch_documents(documents, defnNum=0, stopwords=STOPWORDS,
+                          tokenFilters=None, **filters):
+    """Look up the synonyms of every word in one or more documents.
+
+    All documents are tokenized first, and the words (minus stopwords) are
+    deduplicated across the whole batch, so each unique word is only fetched
+    once no matter how many times or in how many documents it appears.
+
+    Parameters
+    ----------
+    documents : str or iterable of str
+        A single document, or any iterable (list, generator, file...) of them.
+        Since we dedupe over the whole batch, a stream is read to its end
+        before anything is fetched.
+    defnNum : int or 'all', optional
+        Passed on to Word.synonyms(). 0 is the default.
+    stopwords : set of str, optional
+        Lowercase words, with straight apostrophes, that we don't look up.
+        They still show up in the output, with empty synonyms. Defaults to
+        STOPWORDS.
+    tokenFilters : callable, optional
+        Called as tokenFilters(docNum, tokenNum, word) for each token, and
+        should return a dict of _filter() filters (Ex: {'partOfSpeech':
+        POS_VERB}) for that position, or None. These override **filters.
+        Useful if you've already run a pos tagger over the text.
+    **filters
+        _filter() filters applied to every position. See its docstring.
+
+    Returns
+    -------
+    list of Token OR list of list of Token
+        If documents is a str, a list of Token for it. Otherwise, one such
+        list per document. Each Token is a namedtuple of (word, start, end,
+        synonyms), where synonyms is whatever Word.synonyms() returned, or []
+        for stopwords and words thesaurus.com didn't give us.
+    """
+    single = isinstance(documents, str)
+    if single:
+        documents = [documents]
+
+    tokenized = [tokenize(doc) for doc in documents]
+
+    # dict keeps insertion order, so the words get fetched in reading order.
+    unique = {}
+    for tokens in tokenized:
+        for word, _, _ in tokens:
+            key = _token_key(word)
+            if key not in stopwords:
+                unique[key] = None
+
+    words_dict = await fetch_list_of_words(list(unique))
+
+    results = []
+    for docNum, tokens in enumerate(tokenized):
+        doc_results = []
+        for tokenNum, (word, start, end) in enumerate(tokens):
+            w = words_dict.get(_token_key(word))
+
+            # stopword, or the fetch didn't work out (misspelling, noresult...)
+            if w is None or not getattr(w, 'data', None):
+                doc_results.append(Token(word, start, end, []))
+                continue
+
+            curr_filters = dict(filters)
+            if tokenFilters is not None:
+                curr_filters.update(tokenFilters(docNum, tokenNum, word) or {})
+
+            doc_results.append(Token(
+                word, start, end,
+                w.synonyms(defnNum=defnNum, **curr_filters)
+            ))
+        results.append(doc_results)
+
+    return results[0] if single else results
+
 class Word(object):
     def __init__(self, inputWord):
         """Downloads and stores the data thesaurus.com has for a given word.
@@ -101,8 +232,7 @@ class Word(object):
         this is more efficient I think. Let me know if there's a word it doesn't
         work for and I'll change it.
         """
-        url = 'https://www.thesaurus.com/browse/'
-        url = url + self.word.strip().lower().replace(' ', '%20')
+        url = URL_BROWSE + self.word.strip().lower().replace(' ', '%20')
         return url
 
     def parse_html(self, html, r_url):